@@ -16,26 +16,52 @@ Usage:
     # With custom output file
     python3 server.py --port 9876 -o /path/to/domains.txt
 
-    # Stop a running server
+    # Stop a running server (in-flight requests finish, buffered writes are flushed)
     python3 server.py --stop
 
+    # Re-read --config / --blocklist without restarting (SIGHUP)
+    python3 server.py --reload
+
+    # Restart into a fresh process without dropping connections (SIGUSR2)
+    python3 server.py --restart
+
 The server saves domains to domains_collected.txt in the current directory.
 """
 
 import argparse
+import gzip
+import hashlib
+import heapq
 import json
+import logging
+import logging.handlers
 import os
+import queue
 import re
+import select
 import signal
+import socket
 import ssl
 import subprocess
 import sys
 import threading
+import time
+import urllib.error
+import urllib.request
+import zlib
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
 from datetime import datetime
 from http.server import HTTPServer, BaseHTTPRequestHandler
 from socketserver import ThreadingMixIn
 from urllib.parse import parse_qs, urlparse
 
+# Brotli is optional - gzip is always available
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
 # ANSI colors for terminal output
 class Colors:
     HEADER = '\033[95m'
@@ -50,6 +76,45 @@ class Colors:
 # Default output path
 DEFAULT_OUTPUT = "domains_collected.txt"
 
+# Named collections (multi-tenant)
+DEFAULT_COLLECTION = 'default'
+COLLECTION_NAME_RE = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_-]{0,63}$')
+DEFAULT_MAX_LOADED = 16       # collections whose index stays in memory
+DEFAULT_COLLECTION_IDLE = 600  # seconds before an idle collection is unloaded
+MAX_IDLE_SWEEP_INTERVAL = 60   # upper bound on the time between idle sweeps
+
+# Peer sync
+SYNC_TREE_DEPTH = 4       # digest tree levels kept in memory; leaves hold hashes sharing 16 bits
+SYNC_LEAF_SIZE = 16       # nodes with at most this many hashes are compared hash by hash
+SYNC_BATCH = 5000         # tree nodes / hashes / items per request
+SYNC_TIMEOUT = 30         # seconds per peer HTTP request
+
+# Query API
+QUERY_FILTERS = (
+    'host_suffix', 'host_prefix', 'host_contains', 'host_regex',
+    'path_prefix', 'path_suffix', 'path_contains', 'path_regex',
+)
+QUERY_PARAMS = QUERY_FILTERS + ('limit', 'cursor')
+DEFAULT_QUERY_LIMIT = 1000
+MAX_QUERY_LIMIT = 10000
+INDEX_MERGE_THRESHOLD = 4096  # pending index entries before a merge into the main list
+
+# Shutdown, reload and socket handoff
+DEFAULT_DRAIN_TIMEOUT = 10     # seconds to let in-flight requests finish
+LISTEN_FD_ENV = 'CRAWLGOOGLE_LISTEN_FD'  # listening socket inherited from the old process
+HANDOFF_FDS_ENV = 'CRAWLGOOGLE_HANDOFF_FDS'  # "<ready>,<go>" pipes shared with the old process
+HANDOFF_TIMEOUT = 30           # seconds to wait for a successor to come up
+
+# Response compression
+DEFAULT_COMPRESS_MIN_SIZE = 1024  # bytes; smaller responses go out uncompressed
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+# Logging
+LOG_QUEUE_SIZE = 10000  # records buffered before new ones are dropped
+HEALTH_PATHS = ('/ping', '/health')
+
 # Blocked domains (social media, big tech)
 BLOCKED_DOMAINS = [
     # Meta/Facebook
@@ -80,6 +145,9 @@ BLOCKED_DOMAINS = [
     'example.org', 'example.com', 'example.net', 'test.com', 'test.org',
 ]
 
+# Active blocklist: BLOCKED_DOMAINS plus any --blocklist file (swapped on SIGHUP)
+blocked_domains = frozenset(BLOCKED_DOMAINS)
+
 # Statistics
 stats = {
     'total_received': 0,
@@ -92,31 +160,1238 @@ stats_lock = threading.Lock()
 # PID file path (set in main)
 pid_file_path = None
 
+# Server lifecycle (set in main / by signal handlers)
+httpd_server = None
+shutdown_action = None  # 'stop' or 'handoff' once a shutdown has been requested
+handoff_go_fd = None    # closed once drained, letting the successor start serving
+background_stop = threading.Event()
+
+logger = logging.getLogger('crawlgoogle')
+
+# Background log writer (set in setup_logging)
+log_listener = None
+log_queue_handler = None
+
+
+class SamplingFilter(logging.Filter):
+    """Let through 1 in every N records that carry a ``sample`` key.
+
+    Records without a ``sample`` attribute always pass. Each sample key is
+    counted separately so a flood of health checks does not thin out other
+    noisy messages.
+    """
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = max(1, rate)
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        key = getattr(record, 'sample', None)
+        if key is None or self.rate == 1:
+            return True
+        with self._lock:
+            seen = self._counts.get(key, 0)
+            self._counts[key] = seen + 1
+        if seen % self.rate:
+            return False
+        record.sampled = self.rate
+        return True
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class ColorFormatter(logging.Formatter):
+    """Human-readable, ANSI-colored output for interactive terminals"""
+
+    LEVEL_COLORS = {
+        logging.DEBUG: Colors.CYAN,
+        logging.INFO: Colors.GREEN,
+        logging.WARNING: Colors.YELLOW,
+        logging.ERROR: Colors.RED,
+        logging.CRITICAL: Colors.RED,
+    }
+
+    def format(self, record):
+        if getattr(record, 'event', None) == 'access':
+            timestamp = datetime.fromtimestamp(record.created).strftime("%H:%M:%S")
+            status = str(record.status)
+
+            # Color code by status
+            if status.startswith('2'):
+                status_color = Colors.GREEN
+            elif status.startswith('4'):
+                status_color = Colors.YELLOW
+            else:
+                status_color = Colors.RED
+
+            return f"{Colors.CYAN}[{timestamp}]{Colors.ENDC} {Colors.BOLD}{record.method}{Colors.ENDC} {record.path} {status_color}{status}{Colors.ENDC}"
+
+        color = self.LEVEL_COLORS.get(record.levelno, '')
+        indent = '      ' if record.levelno == logging.DEBUG else '    '
+        return f"{indent}{color}{record.getMessage()}{Colors.ENDC}"
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, for journald/log shippers"""
+
+    FIELDS = (
+        'event', 'method', 'path', 'status', 'client', 'collection',
+        'received', 'new_domains', 'total_domains', 'domains', 'sampled',
+    )
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname.lower(),
+            'msg': record.getMessage(),
+        }
+        for field in self.FIELDS:
+            if hasattr(record, field):
+                entry[field] = getattr(record, field)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+def setup_logging(log_format='text', verbose=False, sample_rate=1, stream=None):
+    """Route log records through a queue to a background writer thread"""
+    global log_listener, log_queue_handler
+
+    stop_logging()
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter() if log_format == 'json' else ColorFormatter())
+
+    log_queue_handler = NonBlockingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    log_queue_handler.addFilter(SamplingFilter(sample_rate))
+
+    logger.handlers = [log_queue_handler]
+    logger.propagate = False
+    configure_logging(verbose, sample_rate)
+
+    log_listener = logging.handlers.QueueListener(log_queue_handler.queue, output)
+    log_listener.start()
+
+
+def configure_logging(verbose, sample_rate):
+    """Apply level and sampling settings (safe to call again on reload)"""
+    logger.setLevel(logging.DEBUG if verbose else logging.INFO)
+    if log_queue_handler:
+        for log_filter in log_queue_handler.filters:
+            if isinstance(log_filter, SamplingFilter):
+                log_filter.rate = max(1, sample_rate)
+
+
+def stop_logging():
+    """Flush queued records and stop the background writer"""
+    global log_listener
+
+    if log_listener is None:
+        return
+    log_listener.stop()
+    log_listener = None
+    if log_queue_handler and log_queue_handler.dropped:
+        print(f"{Colors.YELLOW}[!] {log_queue_handler.dropped} log records dropped (queue full){Colors.ENDC}")
+
+
+def negotiate_encoding(accept_encoding):
+    """Pick the best supported content-coding from an Accept-Encoding header"""
+    if not accept_encoding:
+        return None
+
+    offered = {}
+    for part in accept_encoding.split(','):
+        token, _, params = part.partition(';')
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        offered[token] = q
+
+    # Highest q wins; on a tie the earlier (server-preferred) coding is kept
+    supported = ['br', 'gzip'] if brotli else ['gzip']
+    best, best_q = None, 0.0
+    for encoding in supported:
+        q = offered.get(encoding, offered.get('*', 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+class StreamCompressor:
+    """Incremental gzip/brotli compressor with a common interface"""
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._obj = brotli.Compressor(quality=BROTLI_QUALITY)
+            self._feed = self._obj.process
+            self._finish = self._obj.finish
+        else:
+            # wbits=31 produces a gzip container
+            self._obj = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+            self._feed = self._obj.compress
+            self._finish = self._obj.flush
+
+    def compress(self, data):
+        return self._feed(data)
+
+    def finish(self):
+        return self._finish()
+
+
+def compress_bytes(data, encoding):
+    """Compress a complete body in one go"""
+    compressor = StreamCompressor(encoding)
+    return compressor.compress(data) + compressor.finish()
+
+
+class ExportCache:
+    """Keeps the latest compressed export snapshot per (file, kind, encoding).
+
+    Entries are tagged with the collection's version, which every change
+    bumps, so a buffered write that has not reached the file yet still
+    invalidates them.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, path, kind, encoding, stamp):
+        if stamp is None:
+            return None
+        with self._lock:
+            entry = self._entries.get((path, kind, encoding))
+        if entry and entry[0] == stamp:
+            return entry[1]
+        return None
+
+    def put(self, path, kind, encoding, stamp, data):
+        if stamp is None:
+            return
+        with self._lock:
+            self._entries[(path, kind, encoding)] = (stamp, data)
+
+    def discard(self, path):
+        """Drop every snapshot of the given file (e.g. when its collection unloads)"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == path]:
+                del self._entries[key]
+
+
+export_cache = ExportCache()
+
+
+def file_stamp(path):
+    """Return (mtime_ns, size) for a file, or None if it does not exist"""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def iter_export_text(domains):
+    """Yield the plain text export (one item per line, sorted) in chunks"""
+    batch = []
+    batch_size = 0
+    for domain in domains:
+        line = f'{domain}\n'
+        batch.append(line)
+        batch_size += len(line)
+        if batch_size >= EXPORT_CHUNK_SIZE:
+            yield ''.join(batch).encode('utf-8')
+            batch = []
+            batch_size = 0
+    if batch:
+        yield ''.join(batch).encode('utf-8')
+
+
+def iter_export_json(domains):
+    """Yield the JSON export in chunks (same layout as json.dumps(..., indent=2))"""
+    if not domains:
+        yield b'{\n  "domains": []\n}'
+        return
+
+    yield b'{\n  "domains": [\n'
+    batch = []
+    batch_size = 0
+    for i, domain in enumerate(domains):
+        sep = ',\n' if i < len(domains) - 1 else '\n'
+        line = f'    {json.dumps(domain)}{sep}'
+        batch.append(line)
+        batch_size += len(line)
+        if batch_size >= EXPORT_CHUNK_SIZE:
+            yield ''.join(batch).encode('utf-8')
+            batch = []
+            batch_size = 0
+    if batch:
+        yield ''.join(batch).encode('utf-8')
+    yield b'  ]\n}'
+
+
+def item_hash(item):
+    """64-bit content hash of an item, used to compare corpora between peers"""
+    return int.from_bytes(hashlib.sha1(item.encode('utf-8')).digest()[:8], 'big')
+
+
+def digest_str(count, xor):
+    return f'{count}:{xor:016x}'
+
+
+EMPTY_DIGEST = digest_str(0, 0)
+
+
+def digest_count(digest):
+    return int(digest.partition(':')[0])
+
+
+def parse_sync_nodes(nodes, max_depth):
+    """Validate a list of [depth, prefix] tree nodes from a peer request"""
+    if not isinstance(nodes, list) or len(nodes) > SYNC_BATCH:
+        raise ValueError(f'nodes must be a list of at most {SYNC_BATCH} [depth, prefix] pairs')
+    parsed = []
+    for node in nodes:
+        if (not isinstance(node, list) or len(node) != 2
+                or not all(isinstance(v, int) and not isinstance(v, bool) for v in node)):
+            raise ValueError('nodes must be [depth, prefix] integer pairs')
+        depth, prefix = node
+        if not 0 <= depth <= max_depth or not 0 <= prefix < 16 ** depth:
+            raise ValueError(f'Invalid tree node: {node}')
+        parsed.append((depth, prefix))
+    return parsed
+
+
+def parse_sync_hashes(hashes):
+    """Validate a list of hex item hashes from a peer request"""
+    if not isinstance(hashes, list) or len(hashes) > SYNC_BATCH:
+        raise ValueError(f'hashes must be a list of at most {SYNC_BATCH} hex strings')
+    parsed = []
+    for hex_hash in hashes:
+        try:
+            h = int(hex_hash, 16)
+        except (TypeError, ValueError):
+            raise ValueError(f'Invalid hash: {hex_hash!r}')
+        if not 0 <= h < 1 << 64:
+            raise ValueError(f'Invalid hash: {hex_hash!r}')
+        parsed.append(h)
+    return parsed
+
+
+class SyncTree:
+    """Sparse 16-ary digest tree over 64-bit item hashes.
+
+    A node at depth d covers every hash sharing its first d hex digits and
+    its digest is the count and XOR of those hashes. Levels 1 to
+    SYNC_TREE_DEPTH are kept up to date on every add; deeper nodes are
+    derived on demand from the leaf they fall in. Leaves map hash -> item,
+    or to None for a tombstone: a hash settled without storing an item
+    (e.g. one the blocklist rejected), which still counts in the digests
+    so that peers converge.
+    """
+
+    LEAF_SHIFT = 64 - 4 * SYNC_TREE_DEPTH
+
+    def __init__(self):
+        self.count = 0
+        self.xor = 0
+        self.levels = [None] + [{} for _ in range(SYNC_TREE_DEPTH)]
+        self.leaves = {}
+
+    def add(self, h, item):
+        leaf = self.leaves.setdefault(h >> self.LEAF_SHIFT, {})
+        if h in leaf:
+            if item is not None and leaf[h] is None:
+                leaf[h] = item  # a real item replaces its tombstone
+            return
+        leaf[h] = item
+        self.count += 1
+        self.xor ^= h
+        for depth in range(1, SYNC_TREE_DEPTH + 1):
+            level = self.levels[depth]
+            prefix = h >> (64 - 4 * depth)
+            node = level.get(prefix)
+            if node is None:
+                level[prefix] = [1, h]
+            else:
+                node[0] += 1
+                node[1] ^= h
+
+    def digest(self):
+        return digest_str(self.count, self.xor)
+
+    def children(self, depth, prefix):
+        """Digests of the 16 children of a node"""
+        child_depth = depth + 1
+        if child_depth <= SYNC_TREE_DEPTH:
+            level = self.levels[child_depth]
+            digests = []
+            for n in range(16):
+                node = level.get(prefix * 16 + n)
+                digests.append(digest_str(*node) if node else EMPTY_DIGEST)
+            return digests
+
+        counts = [[0, 0] for _ in range(16)]
+        shift = 64 - 4 * child_depth
+        for h in self.hashes(depth, prefix):
+            node = counts[(h >> shift) & 15]
+            node[0] += 1
+            node[1] ^= h
+        return [digest_str(c, x) for c, x in counts]
+
+    def hashes(self, depth, prefix):
+        """All hashes (items and tombstones) under a node"""
+        if depth >= SYNC_TREE_DEPTH:
+            leaf = self.leaves.get(prefix >> 4 * (depth - SYNC_TREE_DEPTH), {})
+            shift = 64 - 4 * depth
+            return [h for h in leaf if h >> shift == prefix]
+
+        span = 4 * (SYNC_TREE_DEPTH - depth)
+        hashes = []
+        if len(self.leaves) < 1 << span:
+            for key, leaf in self.leaves.items():
+                if key >> span == prefix:
+                    hashes.extend(leaf)
+        else:
+            for key in range(prefix << span, (prefix + 1) << span):
+                hashes.extend(self.leaves.get(key, ()))
+        return hashes
+
+    def lookup(self, h):
+        """Return (found, item); item is None for a tombstone"""
+        leaf = self.leaves.get(h >> self.LEAF_SHIFT)
+        if leaf is None or h not in leaf:
+            return False, None
+        return True, leaf[h]
+
+
+def split_item(item):
+    """Split a stored item into (host, path); plain domains have an empty path"""
+    if item.startswith('http://') or item.startswith('https://'):
+        rest = item.partition('://')[2]
+        host, sep, path = rest.partition('/')
+        return host, sep + path
+    return item, ''
+
+
+def reverse_host(host):
+    """'a.gov.br' -> 'br.gov.a', so hosts sharing a suffix sort together"""
+    return '.'.join(reversed(host.split('.')))
+
+
+def prefix_successor(prefix):
+    """Smallest string greater than every string starting with prefix"""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+QUERY_INDEX_KEYS = {
+    'host': lambda item: split_item(item)[0],
+    'reversed_host': lambda item: reverse_host(split_item(item)[0]),
+    'path': lambda item: split_item(item)[1],
+}
+
+
+class SortedIndex:
+    """Sorted (key, item) entries that readers can scan without the collection lock.
+
+    New entries go to a small sorted side list which is merged into a fresh
+    main list once it outgrows INDEX_MERGE_THRESHOLD. Neither list is ever
+    mutated in place, so a view taken under the lock stays consistent while
+    a slow client is being streamed results.
+    """
+
+    def __init__(self, keyfunc, items):
+        self.keyfunc = keyfunc
+        self.main = sorted((keyfunc(item), item) for item in items)
+        self.pending = []
+
+    def add(self, items):
+        entries = sorted((self.keyfunc(item), item) for item in items)
+        pending = list(heapq.merge(self.pending, entries))
+        if len(pending) > INDEX_MERGE_THRESHOLD:
+            self.main = list(heapq.merge(self.main, pending))
+            self.pending = []
+        else:
+            self.pending = pending
+
+    def view(self):
+        return IndexView(self.keyfunc, self.main, self.pending)
+
+
+class IndexView:
+    """Immutable snapshot of a SortedIndex supporting range counts and scans"""
+
+    def __init__(self, keyfunc, main, pending):
+        self.keyfunc = keyfunc
+        self.lists = (main, pending)
+
+    def _bounds(self, entries, lo, hi, after):
+        start = bisect_left(entries, (lo,)) if lo is not None else 0
+        if after is not None:
+            start = max(start, bisect_right(entries, after))
+        end = bisect_left(entries, (hi,)) if hi is not None else len(entries)
+        return start, max(start, end)
+
+    def count(self, lo=None, hi=None):
+        total = 0
+        for entries in self.lists:
+            start, end = self._bounds(entries, lo, hi, None)
+            total += end - start
+        return total
+
+    def scan(self, lo=None, hi=None, cursor=None):
+        """Yield items with lo <= key < hi in key order, resuming after cursor"""
+        after = (self.keyfunc(cursor), cursor) if cursor else None
+        ranges = []
+        for entries in self.lists:
+            start, end = self._bounds(entries, lo, hi, after)
+            ranges.append(map(entries.__getitem__, range(start, end)))
+        for _key, item in heapq.merge(*ranges):
+            yield item
+
+
+def compile_query(filters):
+    """Turn query filters into (index ranges, predicate).
+
+    Index ranges are (index name, lo, hi) candidates the planner can choose
+    from; the predicate re-checks every filter exactly. Raises ValueError on
+    an invalid filter.
+    """
+    checks = []
+    ranges = []
+
+    for name, value in filters.items():
+        field, _, op = name.partition('_')
+        if field == 'host' and op != 'regex':
+            value = value.lower()
+
+        if name == 'host_suffix':
+            suffix = value.lstrip('*').strip('.')
+            if not suffix:
+                raise ValueError('host_suffix must not be empty')
+            rev = reverse_host(suffix)
+            # '/' sorts right after '.', bounding "<rev>" and "<rev>.*"
+            ranges.append(('reversed_host', rev, rev + '/'))
+            checks.append(lambda host, path, s=suffix: host == s or host.endswith('.' + s))
+
+        elif op == 'prefix':
+            ranges.append((field, value, prefix_successor(value)))
+            if field == 'host':
+                checks.append(lambda host, path, p=value: host.startswith(p))
+            else:
+                checks.append(lambda host, path, p=value: path.startswith(p))
+
+        elif op == 'suffix':
+            # path_suffix: no index covers it, so it is checked during the scan
+            checks.append(lambda host, path, v=value: path.endswith(v))
+
+        elif op == 'contains':
+            if field == 'host':
+                checks.append(lambda host, path, v=value: v in host)
+            else:
+                checks.append(lambda host, path, v=value: v in path)
+
+        elif op == 'regex':
+            try:
+                pattern = re.compile(value)
+            except re.error as e:
+                raise ValueError(f'Invalid {name}: {e}')
+            if field == 'host':
+                checks.append(lambda host, path, r=pattern: r.search(host) is not None)
+            else:
+                checks.append(lambda host, path, r=pattern: r.search(path) is not None)
+
+    def predicate(item):
+        host, path = split_item(item)
+        return all(check(host, path) for check in checks)
+
+    return ranges, predicate
+
+
+class Collection:
+    """A named, independently stored set of collected domains/URLs.
+
+    The in-memory index is loaded from the collection's file on first use
+    and may be dropped again by CollectionManager once the collection goes
+    idle; the next access simply reloads it.
+    """
+
+    def __init__(self, name, output_file, buffered=False):
+        self.name = name
+        self.output_file = output_file
+        self.buffered = buffered
+        self.dirty = False
+        self.version = 0      # bumped on every change; keys export snapshots
+        self.lock = threading.RLock()
+        self.total_received = 0
+        self.requests = 0
+        self.last_used = time.monotonic()
+        self._items = None
+        self._sorted = None
+        self._tree = None     # SyncTree, built on first sync
+        self._query = None    # {name: SortedIndex}, built on first query
+        # Root digest of the sync tree; kept across unloads so an unchanged
+        # collection can be compared with a peer without reloading it
+        self.known_root = None
+
+    @property
+    def loaded(self):
+        return self._items is not None
+
+    def _index(self):
+        """Return the item set, loading it from disk if needed (caller holds lock)"""
+        if self._items is None:
+            items = set()
+            if os.path.exists(self.output_file):
+                with open(self.output_file, 'r', encoding='utf-8') as f:
+                    items = set(line.strip() for line in f if line.strip())
+            self._items = items
+        return self._items
+
+    @property
+    def tombstone_file(self):
+        return f'{self.output_file}.rejected'
+
+    def _sync_tree(self):
+        """Return the sync tree, building it if needed (caller holds lock)"""
+        if self._tree is None:
+            tree = SyncTree()
+            for item in self._index():
+                tree.add(item_hash(item), item)
+            if os.path.exists(self.tombstone_file):
+                with open(self.tombstone_file, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            tree.add(int(line.strip(), 16), None)
+                        except ValueError:
+                            continue
+            self._tree = tree
+            self.known_root = tree.digest()
+        return self._tree
+
+    def _query_index(self):
+        """Return the query indexes, building them if needed (caller holds lock)"""
+        if self._query is None:
+            items = self._index()
+            self._query = {
+                name: SortedIndex(keyfunc, items)
+                for name, keyfunc in QUERY_INDEX_KEYS.items()
+            }
+        return self._query
+
+    def unload(self):
+        """Drop the in-memory index; it is reloaded lazily on next access"""
+        with self.lock:
+            self.flush()
+            self._items = None
+            self._sorted = None
+            self._tree = None
+            self._query = None
+        export_cache.discard(self.output_file)
+
+    def count(self):
+        with self.lock:
+            return len(self._index())
+
+    def items(self):
+        """Return all items in sorted order (shared list - do not modify)"""
+        with self.lock:
+            if self._sorted is None:
+                self._sorted = sorted(self._index())
+            return self._sorted
+
+    def add(self, items, received=True, append=False):
+        """Add cleaned items (None entries are ignored) and persist new ones.
+
+        ``received`` controls whether the items count towards total_received;
+        replicated items from peers do not. With ``append`` new items are
+        appended to the file instead of rewriting it in sorted order, so
+        the disk cost tracks the number of new items. Returns the list of
+        items that were not already in the collection.
+        """
+        with self.lock:
+            existing = self._index()
+            new_items = []
+            for item in items:
+                if item and item not in existing:
+                    existing.add(item)
+                    new_items.append(item)
+                    if self._tree is not None:
+                        self._tree.add(item_hash(item), item)
+
+            if received:
+                self.total_received += len(items)
+
+            if new_items:
+                self.version += 1
+                self._sorted = None
+                self.known_root = self._tree.digest() if self._tree is not None else None
+                if self._query is not None:
+                    for index in self._query.values():
+                        index.add(new_items)
+                if self.buffered:
+                    self.dirty = True
+                elif append:
+                    self._append(new_items)
+                else:
+                    self._write()
+
+            return new_items
+
+    def merge(self, items, clean):
+        """Merge items replicated from a peer.
+
+        Items go through ``clean`` like any other input. An item that is
+        rejected or rewritten by cleaning is recorded as a tombstone under
+        its original hash, so both sides' digests still converge. Returns
+        (new items, number rejected).
+        """
+        accepted = []
+        rejected = []
+        for item in items:
+            if not isinstance(item, str):
+                continue
+            cleaned = clean(item)
+            if cleaned:
+                accepted.append(cleaned)
+            if cleaned != item:
+                rejected.append(item_hash(item))
+
+        with self.lock:
+            new_items = self.add(accepted, received=False, append=True)
+            self.reject(rejected)
+        return new_items, len(rejected)
+
+    def reject(self, hashes):
+        """Record tombstones for hashes settled without storing an item"""
+        if not hashes:
+            return
+        with self.lock:
+            tree = self._sync_tree()
+            fresh = [h for h in hashes if not tree.lookup(h)[0]]
+            if not fresh:
+                return
+            for h in fresh:
+                tree.add(h, None)
+            self.known_root = tree.digest()
+
+            output_dir = os.path.dirname(self.output_file)
+            if output_dir:
+                os.makedirs(output_dir, exist_ok=True)
+            with open(self.tombstone_file, 'a', encoding='utf-8') as f:
+                for h in fresh:
+                    f.write(f'{h:016x}\n')
+
+    def _append(self, items):
+        """Append items to the collection file (caller holds lock)"""
+        output_dir = os.path.dirname(self.output_file)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        with open(self.output_file, 'a', encoding='utf-8') as f:
+            for item in items:
+                f.write(f"{item}\n")
+
+    def flush(self):
+        """Write buffered changes to disk, if any"""
+        with self.lock:
+            if self.dirty and self._items is not None:
+                self._write()
+
+    def _write(self):
+        """Rewrite the collection file in sorted order (caller holds lock).
+
+        Writes go to a temporary file that is renamed over the old one, so
+        a process killed mid-write never leaves a truncated collection.
+        """
+        output_dir = os.path.dirname(self.output_file)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+
+        tmp_path = f'{self.output_file}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for item in self.items():
+                f.write(f"{item}\n")
+        os.replace(tmp_path, self.output_file)
+        self.dirty = False
+
+    def clear(self):
+        with self.lock:
+            for path in (self.output_file, self.tombstone_file):
+                if os.path.exists(path):
+                    os.remove(path)
+            self.dirty = False
+            self.version += 1
+            self._items = set()
+            self._sorted = None
+            self._tree = None
+            self.known_root = None
+            self._query = None
+        export_cache.discard(self.output_file)
+
+    def query(self, filters, cursor=None, index=None):
+        """Plan and start a filtered scan.
+
+        Picks whichever index gives the narrowest candidate range for the
+        filters (falling back to a full scan in host order) and returns
+        (index name, candidate count, iterator of matching items). Passing
+        ``index`` pins the choice so a paginated query keeps its order.
+        """
+        ranges, predicate = compile_query(filters)
+
+        with self.lock:
+            views = {name: view.view() for name, view in self._query_index().items()}
+
+        index_name, lo, hi = 'scan', None, None
+        candidates = views['host'].count()
+        for name, range_lo, range_hi in ranges:
+            if index is not None and name != index:
+                continue
+            size = views[name].count(range_lo, range_hi)
+            if size < candidates or index_name == 'scan':
+                index_name, lo, hi, candidates = name, range_lo, range_hi, size
+
+        view = views['host' if index_name == 'scan' else index_name]
+        matches = (item for item in view.scan(lo, hi, cursor) if predicate(item))
+        return index_name, candidates, matches
+
+    def sync_root(self):
+        """Digest of the whole collection (items and tombstones)"""
+        with self.lock:
+            return self._sync_tree().digest()
+
+    def sync_children(self, nodes):
+        """Child digests for each (depth, prefix) tree node"""
+        with self.lock:
+            tree = self._sync_tree()
+            return [tree.children(depth, prefix) for depth, prefix in nodes]
+
+    def sync_hashes(self, nodes):
+        """Hex hashes under each (depth, prefix) tree node"""
+        with self.lock:
+            tree = self._sync_tree()
+            return [[f'{h:016x}' for h in tree.hashes(depth, prefix)] for depth, prefix in nodes]
+
+    def sync_lookup(self, hashes):
+        """Resolve integer hashes to (items, tombstone hashes); unknown ones are skipped"""
+        with self.lock:
+            tree = self._sync_tree()
+            items = []
+            tombstones = []
+            for h in hashes:
+                found, item = tree.lookup(h)
+                if item is not None:
+                    items.append(item)
+                elif found:
+                    tombstones.append(h)
+            return items, tombstones
+
+
+class CollectionManager:
+    """Maps collection names to Collection objects and bounds memory use.
+
+    Only the most recently used ``max_loaded`` collections keep their index
+    in memory, and any collection untouched for ``idle_timeout`` seconds is
+    unloaded. The default collection (the legacy ``-o`` file) stays pinned.
+    """
+
+    def __init__(self, default_file, directory, max_loaded=DEFAULT_MAX_LOADED,
+                 idle_timeout=DEFAULT_COLLECTION_IDLE, buffered=False):
+        self.default = Collection(DEFAULT_COLLECTION, default_file, buffered)
+        self.directory = directory
+        self.buffered = buffered
+        self.max_loaded = max(1, max_loaded)
+        self.idle_timeout = idle_timeout
+        self._collections = OrderedDict()  # least recently used first
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def valid_name(name):
+        return bool(COLLECTION_NAME_RE.match(name or ''))
+
+    def path_for(self, name):
+        return os.path.join(self.directory, f'{name}.txt')
+
+    def get(self, name, create=True, touch=True):
+        """Return the named collection, or None if it does not exist and create is False.
+
+        ``touch=False`` looks the collection up without counting it as used,
+        so background work can inspect it without disturbing the LRU order.
+        """
+        if name == DEFAULT_COLLECTION:
+            if touch:
+                self.default.last_used = time.monotonic()
+            return self.default
+
+        if not self.valid_name(name):
+            return None
+
+        with self._lock:
+            collection = self._collections.get(name)
+            if collection is None:
+                path = self.path_for(name)
+                if not create and not os.path.exists(path):
+                    return None
+                collection = Collection(name, path, self.buffered)
+                self._collections[name] = collection
+                if not touch:
+                    self._collections.move_to_end(name, last=False)
+
+            if not touch:
+                return collection
+
+            self._collections.move_to_end(name)
+            collection.last_used = time.monotonic()
+            victims = self._pick_victims(collection)
+
+        for victim in victims:
+            victim.unload()
+            logger.debug('Unloaded idle collection %s', victim.name)
+
+        return collection
+
+    def _pick_victims(self, keep=None):
+        """Choose loaded collections to unload, oldest first (caller holds _lock)"""
+        now = time.monotonic()
+        loaded = [c for c in self._collections.values() if c.loaded and c is not keep]
+        excess = len(loaded) - (self.max_loaded - (1 if keep else 0))
+
+        victims = []
+        for collection in loaded:
+            if excess > 0 or now - collection.last_used > self.idle_timeout:
+                victims.append(collection)
+                excess -= 1
+        return victims
+
+    def unload_idle(self):
+        """Unload collections idle past idle_timeout (or beyond max_loaded)"""
+        with self._lock:
+            victims = self._pick_victims()
+        for victim in victims:
+            victim.unload()
+            logger.debug('Unloaded idle collection %s', victim.name)
+
+    def flush_all(self):
+        """Write every collection's buffered changes to disk"""
+        with self._lock:
+            collections = [self.default] + list(self._collections.values())
+        for collection in collections:
+            try:
+                collection.flush()
+            except OSError as e:
+                logger.error('Failed to flush collection %s: %s', collection.name, e)
+
+    def names(self):
+        """All known collection names, including ones only present on disk"""
+        names = set()
+        if os.path.isdir(self.directory):
+            for filename in os.listdir(self.directory):
+                base, ext = os.path.splitext(filename)
+                if ext == '.txt' and self.valid_name(base):
+                    names.add(base)
+        with self._lock:
+            names.update(self._collections)
+        names.discard(DEFAULT_COLLECTION)
+        return [DEFAULT_COLLECTION] + sorted(names)
+
+    def describe(self, name):
+        """Summary for /collections without forcing the index into memory"""
+        collection = self.default if name == DEFAULT_COLLECTION else self._collections.get(name)
+        path = collection.output_file if collection else self.path_for(name)
+        stamp = file_stamp(path)
+        info = {
+            'name': name,
+            'loaded': bool(collection and collection.loaded),
+            'size_bytes': stamp[1] if stamp else 0,
+        }
+        if collection and collection.loaded:
+            info['total_domains'] = collection.count()
+        return info
+
+
+class LocalPeer:
+    """Stand-in peer backed by another collection in this process (for testing)"""
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.name = f'local:{collection.name}'
+
+    def root(self):
+        return self.collection.sync_root()
+
+    def children(self, nodes):
+        return self.collection.sync_children(nodes)
+
+    def hashes(self, nodes):
+        return self.collection.sync_hashes(nodes)
+
+    def items(self, hashes):
+        return self.collection.sync_lookup([int(h, 16) for h in hashes])[0]
+
+    def push(self, items, tombstones):
+        new_items, rejected = self.collection.merge(items, DomainHandler.clean_item)
+        self.collection.reject([int(h, 16) for h in tombstones])
+        return {'new_domains': len(new_items), 'rejected': rejected}
+
+
+class HttpPeer:
+    """Remote CrawlGoogle server reached through its /sync endpoints"""
+
+    def __init__(self, base_url, collection_name, insecure=False):
+        prefix = '' if collection_name == DEFAULT_COLLECTION else f'/c/{collection_name}'
+        self.name = base_url
+        self.base = base_url.rstrip('/') + prefix + '/sync'
+        self.context = ssl._create_unverified_context() if insecure else None
+
+    def _request(self, path, payload=None, if_missing=None):
+        """Call a sync endpoint; ``if_missing`` is returned if the peer lacks the collection"""
+        data = None if payload is None else json.dumps(payload).encode('utf-8')
+        request = urllib.request.Request(self.base + path, data=data, headers={
+            'Content-Type': 'application/json',
+            'Accept-Encoding': 'gzip',
+        })
+        try:
+            with urllib.request.urlopen(request, timeout=SYNC_TIMEOUT, context=self.context) as response:
+                body = response.read()
+                if response.headers.get('Content-Encoding') == 'gzip':
+                    body = gzip.decompress(body)
+        except urllib.error.HTTPError as e:
+            if e.code == 404 and if_missing is not None:
+                return if_missing
+            raise
+        return json.loads(body.decode('utf-8'))
+
+    def root(self):
+        return self._request('/root', if_missing={'root': EMPTY_DIGEST})['root']
+
+    def children(self, nodes):
+        empty = {'children': [[EMPTY_DIGEST] * 16 for _ in nodes]}
+        return self._request('/tree', {'nodes': nodes}, if_missing=empty)['children']
+
+    def hashes(self, nodes):
+        empty = {'hashes': [[] for _ in nodes]}
+        return self._request('/hashes', {'nodes': nodes}, if_missing=empty)['hashes']
+
+    def items(self, hashes):
+        return self._request('/items', {'hashes': hashes}, if_missing={'items': []})['items']
+
+    def push(self, items, tombstones):
+        return self._request('/push', {'items': items, 'tombstones': tombstones})
+
+
+def sync_collection(collection, peer, mode='both', remote_root=None):
+    """Exchange items missing on either side between a collection and a peer.
+
+    Both sides walk their digest trees from the root, descending only into
+    nodes whose digests differ, and list hashes only for small differing
+    nodes; then only the missing items are transferred. Network cost thus
+    tracks the size of the difference (times the tree depth), not the
+    corpus. Merged items are cleaned, rejected ones become tombstones on
+    both sides, and merging is a set union, so repeated or concurrent
+    rounds are idempotent and converge.
+    """
+    result = {'peer': peer.name, 'collection': collection.name, 'mode': mode,
+              'pulled': 0, 'pushed': 0, 'rejected': 0, 'nodes': 0, 'hashes_listed': 0}
+
+    if remote_root is None:
+        remote_root = peer.root()
+    if collection.known_root == remote_root:
+        result['in_sync'] = True
+        return result
+
+    local_root = collection.sync_root()
+    if local_root == remote_root:
+        result['in_sync'] = True
+        return result
+
+    # Descend the tree to find the small nodes that actually differ
+    leaves = []
+    frontier = []
+    if max(digest_count(local_root), digest_count(remote_root)) <= SYNC_LEAF_SIZE:
+        leaves.append((0, 0))
+    else:
+        frontier.append((0, 0))
+
+    while frontier:
+        next_frontier = []
+        for i in range(0, len(frontier), SYNC_BATCH):
+            batch = frontier[i:i + SYNC_BATCH]
+            result['nodes'] += len(batch)
+            mine = collection.sync_children(batch)
+            theirs = peer.children([list(node) for node in batch])
+            for (depth, prefix), local_digests, remote_digests in zip(batch, mine, theirs):
+                for n in range(16):
+                    if local_digests[n] == remote_digests[n]:
+                        continue
+                    node = (depth + 1, prefix * 16 + n)
+                    size = max(digest_count(local_digests[n]), digest_count(remote_digests[n]))
+                    if size <= SYNC_LEAF_SIZE or depth + 1 == 16:
+                        leaves.append(node)
+                    else:
+                        next_frontier.append(node)
+        frontier = next_frontier
+
+    missing = []
+    extra = []
+    for i in range(0, len(leaves), SYNC_BATCH):
+        batch = leaves[i:i + SYNC_BATCH]
+        mine = collection.sync_hashes(batch)
+        theirs = peer.hashes([list(node) for node in batch])
+        for local_hashes, remote_hashes in zip(mine, theirs):
+            result['hashes_listed'] += len(local_hashes) + len(remote_hashes)
+            local_set = set(local_hashes)
+            remote_set = set(remote_hashes)
+            missing.extend(h for h in remote_hashes if h not in local_set)
+            extra.extend(h for h in local_hashes if h not in remote_set)
+
+    if mode in ('pull', 'both'):
+        for i in range(0, len(missing), SYNC_BATCH):
+            wanted = set(missing[i:i + SYNC_BATCH])
+            # Only accept items that hash to what we asked for
+            items = [item for item in peer.items(list(wanted))
+                     if isinstance(item, str) and f'{item_hash(item):016x}' in wanted]
+            new_items, rejected = collection.merge(items, DomainHandler.clean_item)
+            # Hashes the peer could not return are tombstones there; settle them here too
+            returned = {f'{item_hash(item):016x}' for item in items}
+            collection.reject([int(h, 16) for h in wanted - returned])
+            result['pulled'] += len(new_items)
+            result['rejected'] += rejected
+
+    if mode in ('push', 'both'):
+        for i in range(0, len(extra), SYNC_BATCH):
+            items, tombstones = collection.sync_lookup([int(h, 16) for h in extra[i:i + SYNC_BATCH]])
+            response = peer.push(items, [f'{h:016x}' for h in tombstones])
+            result['pushed'] += response['new_domains']
+            result['rejected'] += response['rejected']
+
+    result['in_sync'] = collection.sync_root() == peer.root()
+    return result
+
+
+def make_peer(spec, collection, collections, insecure=False):
+    """Build a peer from a URL or a 'local:<collection>' stand-in spec"""
+    if spec.startswith('local:'):
+        other = collections.get(spec[len('local:'):], create=False)
+        if other is None:
+            raise ValueError(f'Invalid local peer: {spec}')
+        return LocalPeer(other)
+    return HttpPeer(spec, collection.name, insecure)
+
+
+def sync_loop(collections, peers, interval, insecure=False, stop_event=None):
+    """Periodically sync every collection with every configured peer.
+
+    A collection whose last known root digest matches the peer's is
+    skipped without being loaded, so idle collections stay unloaded.
+    """
+    stop_event = stop_event or threading.Event()
+    while not stop_event.wait(interval):
+        # Snapshot: a reload may replace the peer list at any time
+        specs = list(peers)
+        if not specs:
+            continue
+        for name in collections.names():
+            collection = collections.get(name, touch=False)
+            if collection is None:
+                continue
+            for spec in specs:
+                try:
+                    peer = make_peer(spec, collection, collections, insecure)
+                    remote_root = peer.root()
+                    if collection.known_root == remote_root:
+                        continue
+                    collections.get(name)  # about to load: count it towards the LRU
+                    result = sync_collection(collection, peer, remote_root=remote_root)
+                except Exception as e:
+                    logger.warning('Sync of %s with %s failed: %s', name, spec, e,
+                                   extra={'event': 'sync', 'collection': name})
+                    continue
+                if collection is collections.default:
+                    with stats_lock:
+                        stats['unique_domains'] = collection.count()
+                if result['pulled'] or result['pushed']:
+                    logger.info('Synced %s with %s: +%d pulled, %d pushed', name, spec,
+                                result['pulled'], result['pushed'],
+                                extra={'event': 'sync', 'collection': name})
+
 
 class ThreadedHTTPServer(ThreadingMixIn, HTTPServer):
     """Handle requests in separate threads"""
     daemon_threads = True
+    request_queue_size = 128  # connections wait here while a drain/handoff is in progress
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.active_requests = 0
+        self._idle = threading.Condition()
+
+    def process_request(self, request, client_address):
+        # Counted before the worker thread starts so a drain cannot miss it
+        with self._idle:
+            self.active_requests += 1
+        super().process_request(request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            super().process_request_thread(request, client_address)
+        finally:
+            with self._idle:
+                self.active_requests -= 1
+                self._idle.notify_all()
+
+    def wait_idle(self, timeout):
+        """Wait for in-flight requests to finish; returns False on timeout"""
+        with self._idle:
+            return self._idle.wait_for(lambda: self.active_requests == 0, timeout)
 
 
 class DomainHandler(BaseHTTPRequestHandler):
-    output_file = DEFAULT_OUTPUT
+    collections = None  # CollectionManager, set in main
+    peers = []          # peer URLs allowed for POST /sync, set in main
+    peer_insecure = False
+    compress_min_size = DEFAULT_COMPRESS_MIN_SIZE
     server_version = "CrawlGoogle/2.0"
 
-    def log_message(self, format, *args):
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        method = args[0].split()[0] if args else "?"
-        path = args[0].split()[1] if args and len(args[0].split()) > 1 else "?"
-        status = args[1] if len(args) > 1 else "?"
-
-        # Color code by status
-        if str(status).startswith('2'):
-            status_color = Colors.GREEN
-        elif str(status).startswith('4'):
-            status_color = Colors.YELLOW
-        else:
-            status_color = Colors.RED
+    def log_request(self, code='-', size='-'):
+        """Queue a structured access log record"""
+        parts = self.requestline.split()
+        method = parts[0] if parts else "?"
+        path = parts[1] if len(parts) > 1 else "?"
+        status = getattr(code, 'value', code)
+
+        extra = {
+            'event': 'access',
+            'method': method,
+            'path': path,
+            'status': status,
+            'client': self.client_address[0],
+        }
+        if urlparse(path).path in HEALTH_PATHS:
+            extra['sample'] = 'health'
+
+        logger.info('%s %s %s', method, path, status, extra=extra)
 
-        print(f"{Colors.CYAN}[{timestamp}]{Colors.ENDC} {Colors.BOLD}{method}{Colors.ENDC} {path} {status_color}{status}{Colors.ENDC}")
+    def log_message(self, format, *args):
+        logger.warning(format, *args, extra={'client': self.client_address[0]})
 
     def send_cors_headers(self):
         """Send CORS headers to allow requests from Chrome extension"""
@@ -125,13 +1400,157 @@ class DomainHandler(BaseHTTPRequestHandler):
         self.send_header('Access-Control-Allow-Headers', 'Content-Type, Accept, Origin, X-Requested-With')
         self.send_header('Access-Control-Max-Age', '86400')
 
+    def negotiate_compression(self, size):
+        """Return the content-coding to use for a body of the given size, or None"""
+        if size < self.compress_min_size:
+            return None
+        return negotiate_encoding(self.headers.get('Accept-Encoding'))
+
     def send_json_response(self, status_code, data):
         """Helper to send JSON responses"""
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        encoding = self.negotiate_compression(len(body))
+        if encoding:
+            body = compress_bytes(body, encoding)
+
         self.send_response(status_code)
         self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Vary', 'Accept-Encoding')
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_cors_headers()
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_query_results(self, collection, index_name, candidates, matches, limit):
+        """Stream a page of query results as a JSON object.
+
+        Results are written as they are found; the count and the cursor for
+        the next page follow the result list. Output is held back until it
+        reaches --compress-min-size, so small pages go out uncompressed
+        like any other small response.
+        """
+        pending = []
+        pending_size = 0
+        compressor = None
+        started = False
+
+        def start(encoding):
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Vary', 'Accept-Encoding')
+            if encoding:
+                self.send_header('Content-Encoding', encoding)
+            elif pending_size < self.compress_min_size:
+                self.send_header('Content-Length', str(pending_size))
+            self.send_cors_headers()
+            self.end_headers()
+
+        def write(text):
+            nonlocal pending_size, compressor, started
+            data = text.encode('utf-8')
+            if not started:
+                pending.append(data)
+                pending_size += len(data)
+                if pending_size < self.compress_min_size:
+                    return
+                encoding = self.negotiate_compression(pending_size)
+                start(encoding)
+                started = True
+                compressor = StreamCompressor(encoding) if encoding else None
+                data = b''.join(pending)
+                pending.clear()
+            if compressor:
+                data = compressor.compress(data)
+            if data:
+                self.wfile.write(data)
+
+        head = json.dumps({
+            'status': 'ok',
+            'collection': collection.name,
+            'index': index_name,
+            'candidates': candidates,
+        }, ensure_ascii=False)
+        write(head[:-1] + ', "results": [')
+
+        count = 0
+        last = None
+        batch = []
+        for item in matches:
+            if count == limit:
+                break
+            batch.append(json.dumps(item, ensure_ascii=False))
+            count += 1
+            last = item
+            if len(batch) >= 500:
+                write((', ' if count > len(batch) else '') + ', '.join(batch))
+                batch = []
+        else:
+            last = None  # ran out of matches: no further page
+        if batch:
+            write((', ' if count > len(batch) else '') + ', '.join(batch))
+
+        next_cursor = f'{index_name}:{last}' if last is not None else None
+        write('], ' + json.dumps({'count': count, 'next_cursor': next_cursor})[1:])
+
+        if not started:
+            start(None)
+            self.wfile.write(b''.join(pending))
+        elif compressor:
+            self.wfile.write(compressor.finish())
+
+    def send_export(self, collection, kind, content_type, filename, chunks):
+        """Send an export download, compressing it on the fly when worthwhile.
+
+        Compressed output is streamed to the client as it is produced and the
+        finished snapshot is cached, so repeated downloads of an unchanged
+        collection skip recompression entirely.
+        """
+        # Read the version before the items, so a snapshot is never tagged
+        # with a newer version than the data it holds
+        stamp = (collection.version,)
+        if collection.dirty:
+            size = sum(len(item) + 1 for item in collection.items())
+        else:
+            file_size = file_stamp(collection.output_file)
+            size = file_size[1] if file_size else 0
+        encoding = self.negotiate_compression(size)
+
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Disposition', f'attachment; filename="{filename}"')
+        self.send_header('Vary', 'Accept-Encoding')
         self.send_cors_headers()
+
+        if not encoding:
+            self.end_headers()
+            for chunk in chunks():
+                self.wfile.write(chunk)
+            return
+
+        self.send_header('Content-Encoding', encoding)
+
+        cached = export_cache.get(collection.output_file, kind, encoding, stamp)
+        if cached is not None:
+            self.send_header('Content-Length', str(len(cached)))
+            self.end_headers()
+            self.wfile.write(cached)
+            return
+
         self.end_headers()
-        self.wfile.write(json.dumps(data, ensure_ascii=False).encode('utf-8'))
+        compressor = StreamCompressor(encoding)
+        parts = []
+        for chunk in chunks():
+            out = compressor.compress(chunk)
+            if out:
+                parts.append(out)
+                self.wfile.write(out)
+        out = compressor.finish()
+        parts.append(out)
+        self.wfile.write(out)
+
+        export_cache.put(collection.output_file, kind, encoding, stamp, b''.join(parts))
 
     def do_OPTIONS(self):
         """Handle CORS preflight requests"""
@@ -139,6 +1558,53 @@ class DomainHandler(BaseHTTPRequestHandler):
         self.send_cors_headers()
         self.end_headers()
 
+    def read_json_body(self):
+        """Read and decode a JSON object body; sends an error and returns None on failure"""
+        content_length = int(self.headers.get('Content-Length', 0))
+
+        if content_length == 0:
+            self.send_json_response(400, {'error': 'Empty request body'})
+            return None
+
+        if content_length > 10 * 1024 * 1024:  # 10MB limit
+            self.send_json_response(413, {'error': 'Request too large'})
+            return None
+
+        try:
+            data = json.loads(self.rfile.read(content_length).decode('utf-8'))
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            self.send_json_response(400, {'error': f'Invalid JSON: {str(e)}'})
+            return None
+
+        if not isinstance(data, dict):
+            self.send_json_response(400, {'error': 'Expected a JSON object'})
+            return None
+
+        return data
+
+    def resolve_collection(self, path, create_for=()):
+        """Split a request path into (collection, endpoint path).
+
+        ``/c/<name>/<endpoint>`` addresses a named collection; every other
+        path addresses the default collection. A missing collection is only
+        created when the endpoint is listed in ``create_for``. Sends an error
+        response and returns (None, None) if the name is invalid or unknown.
+        """
+        if not path.startswith('/c/'):
+            return self.collections.default, path
+
+        name, _, rest = path[3:].partition('/')
+        if not self.collections.valid_name(name):
+            self.send_json_response(400, {'error': f'Invalid collection name: {name!r}'})
+            return None, None
+
+        collection = self.collections.get(name, create='/' + rest in create_for)
+        if collection is None:
+            self.send_json_response(404, {'error': f'Unknown collection: {name}'})
+            return None, None
+
+        return collection, '/' + rest
+
     def do_GET(self):
         """Handle GET requests"""
         global stats
@@ -167,18 +1633,31 @@ class DomainHandler(BaseHTTPRequestHandler):
                 }
             }
             self.send_json_response(200, response)
+            return
+
+        if path == '/collections':
+            names = self.collections.names()
+            self.send_json_response(200, {
+                'status': 'ok',
+                'count': len(names),
+                'collections': [self.collections.describe(name) for name in names]
+            })
+            return
 
-        elif path == '/domains':
+        collection, path = self.resolve_collection(path)
+        if collection is None:
+            return
+
+        with collection.lock:
+            collection.requests += 1
+
+        if path == '/domains':
             # Return current domains with optional pagination
             query_params = parse_qs(parsed_path.query)
             limit = int(query_params.get('limit', [0])[0])
             offset = int(query_params.get('offset', [0])[0])
 
-            domains = []
-            if os.path.exists(self.output_file):
-                with open(self.output_file, 'r', encoding='utf-8') as f:
-                    domains = [line.strip() for line in f if line.strip()]
-
+            domains = collection.items()
             total = len(domains)
 
             if limit > 0:
@@ -186,6 +1665,7 @@ class DomainHandler(BaseHTTPRequestHandler):
 
             response = {
                 'status': 'ok',
+                'collection': collection.name,
                 'count': len(domains),
                 'total': total,
                 'offset': offset,
@@ -194,55 +1674,79 @@ class DomainHandler(BaseHTTPRequestHandler):
             self.send_json_response(200, response)
 
         elif path == '/stats':
-            unique_count = 0
-            if os.path.exists(self.output_file):
-                with open(self.output_file, 'r', encoding='utf-8') as f:
-                    unique_count = sum(1 for line in f if line.strip())
-
             uptime = None
             if stats['start_time']:
                 uptime = str(datetime.now() - stats['start_time']).split('.')[0]
 
+            # The default collection keeps reporting the process-wide counters
+            # it always has; named collections report their own
+            if collection is self.collections.default:
+                total_received, requests = stats['total_received'], stats['requests']
+            else:
+                total_received, requests = collection.total_received, collection.requests
+
             response = {
                 'status': 'ok',
-                'total_domains': unique_count,
-                'total_received': stats['total_received'],
-                'requests': stats['requests'],
+                'collection': collection.name,
+                'total_domains': collection.count(),
+                'total_received': total_received,
+                'requests': requests,
                 'uptime': uptime,
-                'output_file': os.path.abspath(self.output_file)
+                'output_file': os.path.abspath(collection.output_file)
             }
             self.send_json_response(200, response)
 
         elif path == '/export':
             # Export domains as plain text
-            self.send_response(200)
-            self.send_header('Content-Type', 'text/plain; charset=utf-8')
-            self.send_header('Content-Disposition', 'attachment; filename="domains.txt"')
-            self.send_cors_headers()
-            self.end_headers()
-
-            if os.path.exists(self.output_file):
-                with open(self.output_file, 'rb') as f:
-                    self.wfile.write(f.read())
+            self.send_export(collection, 'text', 'text/plain; charset=utf-8', 'domains.txt',
+                             lambda: iter_export_text(collection.items()))
 
         elif path == '/export/json':
             # Export domains as JSON
-            domains = []
-            if os.path.exists(self.output_file):
-                with open(self.output_file, 'r', encoding='utf-8') as f:
-                    domains = [line.strip() for line in f if line.strip()]
+            self.send_export(collection, 'json', 'application/json; charset=utf-8', 'domains.json',
+                             lambda: iter_export_json(collection.items()))
 
-            self.send_response(200)
-            self.send_header('Content-Type', 'application/json; charset=utf-8')
-            self.send_header('Content-Disposition', 'attachment; filename="domains.json"')
-            self.send_cors_headers()
-            self.end_headers()
-            self.wfile.write(json.dumps({'domains': domains}, indent=2).encode('utf-8'))
+        elif path == '/query':
+            # Filtered, paginated view of the collection served from its indexes
+            query_params = parse_qs(parsed_path.query)
+            unknown = sorted(set(query_params) - set(QUERY_PARAMS))
+            if unknown:
+                self.send_json_response(400, {'error': f"Unknown parameter: {', '.join(unknown)}",
+                                              'filters': list(QUERY_FILTERS)})
+                return
+            filters = {
+                name: query_params[name][0]
+                for name in QUERY_FILTERS if query_params.get(name, [''])[0]
+            }
+
+            index = None
+            cursor = query_params.get('cursor', [''])[0] or None
+            if cursor:
+                index, _, cursor = cursor.partition(':')
+                if index not in QUERY_INDEX_KEYS and index != 'scan' or not cursor:
+                    self.send_json_response(400, {'error': 'Invalid cursor'})
+                    return
+
+            try:
+                limit = int(query_params.get('limit', [DEFAULT_QUERY_LIMIT])[0])
+                if limit < 1:
+                    raise ValueError('limit must be positive')
+                index_name, candidates, matches = collection.query(filters, cursor, index)
+            except ValueError as e:
+                self.send_json_response(400, {'error': str(e), 'filters': list(QUERY_FILTERS)})
+                return
+
+            self.send_query_results(collection, index_name, candidates, matches,
+                                    min(limit, MAX_QUERY_LIMIT))
+
+        elif path == '/sync/root':
+            # Root digest a peer compares against its own before descending the tree
+            self.send_json_response(200, {'root': collection.sync_root()})
 
         else:
             self.send_json_response(404, {'error': 'Not found', 'available_endpoints': [
-                'GET /ping', 'GET /domains', 'GET /stats', 'GET /export',
-                'POST /domains', 'POST /clear'
+                'GET /ping', 'GET /collections', 'GET /domains', 'GET /query', 'GET /stats', 'GET /export',
+                'POST /domains', 'POST /clear', 'GET|POST /c/<name>/<endpoint>'
             ]})
 
     def do_POST(self):
@@ -252,7 +1756,15 @@ class DomainHandler(BaseHTTPRequestHandler):
         with stats_lock:
             stats['requests'] += 1
 
-        if self.path == '/domains':
+        collection, path = self.resolve_collection(urlparse(self.path).path,
+                                                   create_for=('/domains', '/sync', '/sync/push'))
+        if collection is None:
+            return
+
+        with collection.lock:
+            collection.requests += 1
+
+        if path == '/domains':
             content_length = int(self.headers.get('Content-Length', 0))
 
             if content_length == 0:
@@ -276,74 +1788,151 @@ class DomainHandler(BaseHTTPRequestHandler):
                     self.send_json_response(400, {'error': 'Domains must be a list'})
                     return
 
-                # Read existing domains
-                existing_domains = set()
-                if os.path.exists(self.output_file):
-                    with open(self.output_file, 'r', encoding='utf-8') as f:
-                        existing_domains = set(line.strip() for line in f if line.strip())
-
                 # Process and add new unique items (domains or URLs)
-                new_domains = []
-                for item in domains:
-                    cleaned = self.clean_item(item)
-                    if cleaned and cleaned not in existing_domains:
-                        existing_domains.add(cleaned)
-                        new_domains.append(cleaned)
-
-                # Write all domains to file
-                output_dir = os.path.dirname(self.output_file)
-                if output_dir:
-                    os.makedirs(output_dir, exist_ok=True)
-
-                with open(self.output_file, 'w', encoding='utf-8') as f:
-                    for domain in sorted(existing_domains):
-                        f.write(f"{domain}\n")
+                new_domains = collection.add([self.clean_item(item) for item in domains])
+                total_domains = collection.count()
 
                 # Update stats
                 with stats_lock:
                     stats['total_received'] += len(domains)
-                    stats['unique_domains'] = len(existing_domains)
+                    if collection is self.collections.default:
+                        stats['unique_domains'] = total_domains
 
                 self.send_json_response(200, {
                     'status': 'ok',
+                    'collection': collection.name,
                     'received': len(domains),
                     'new_domains': len(new_domains),
-                    'total_domains': len(existing_domains),
+                    'total_domains': total_domains,
                     'message': f'Added {len(new_domains)} new domains'
                 })
 
                 # Log new domains
                 if new_domains:
-                    print(f"    {Colors.GREEN}+{len(new_domains)} new domains:{Colors.ENDC}")
-                    for d in new_domains[:10]:
-                        print(f"      {Colors.CYAN}{d}{Colors.ENDC}")
-                    if len(new_domains) > 10:
-                        print(f"      {Colors.YELLOW}... and {len(new_domains) - 10} more{Colors.ENDC}")
+                    logger.info('+%d new domains', len(new_domains), extra={
+                        'event': 'ingest',
+                        'collection': collection.name,
+                        'received': len(domains),
+                        'new_domains': len(new_domains),
+                        'total_domains': total_domains,
+                        'domains': new_domains[:10],
+                    })
+                    if logger.isEnabledFor(logging.DEBUG):
+                        for d in new_domains[:10]:
+                            logger.debug('%s', d)
+                        if len(new_domains) > 10:
+                            logger.debug('... and %d more', len(new_domains) - 10)
                 else:
-                    print(f"    {Colors.YELLOW}No new unique domains (all duplicates){Colors.ENDC}")
+                    logger.info('No new unique domains (all duplicates)', extra={
+                        'event': 'ingest',
+                        'collection': collection.name,
+                        'received': len(domains),
+                        'new_domains': 0,
+                        'total_domains': total_domains,
+                        'sample': 'duplicates',
+                    })
 
             except json.JSONDecodeError as e:
                 self.send_json_response(400, {'error': f'Invalid JSON: {str(e)}'})
 
             except Exception as e:
-                print(f"    {Colors.RED}Error: {str(e)}{Colors.ENDC}")
+                logger.error('Error: %s', e)
                 self.send_json_response(500, {'error': str(e)})
 
-        elif self.path == '/clear':
+        elif path == '/clear':
             # Clear all domains
-            if os.path.exists(self.output_file):
-                os.remove(self.output_file)
+            collection.clear()
 
-            with stats_lock:
-                stats['unique_domains'] = 0
+            if collection is self.collections.default:
+                with stats_lock:
+                    stats['unique_domains'] = 0
 
             self.send_json_response(200, {'status': 'ok', 'message': 'All domains cleared'})
-            print(f"    {Colors.YELLOW}All domains cleared{Colors.ENDC}")
+            logger.warning('All domains cleared', extra={'event': 'clear', 'collection': collection.name})
+
+        elif path in ('/sync/tree', '/sync/hashes'):
+            # Child digests (or hashes) of the tree nodes a peer found differing
+            data = self.read_json_body()
+            if data is None:
+                return
+            try:
+                nodes = parse_sync_nodes(data.get('nodes', []), 15 if path == '/sync/tree' else 16)
+            except ValueError as e:
+                self.send_json_response(400, {'error': str(e)})
+                return
+            if path == '/sync/tree':
+                self.send_json_response(200, {'children': collection.sync_children(nodes)})
+            else:
+                self.send_json_response(200, {'hashes': collection.sync_hashes(nodes)})
+
+        elif path == '/sync/items':
+            data = self.read_json_body()
+            if data is None:
+                return
+            try:
+                hashes = parse_sync_hashes(data.get('hashes', []))
+            except ValueError as e:
+                self.send_json_response(400, {'error': str(e)})
+                return
+            self.send_json_response(200, {'items': collection.sync_lookup(hashes)[0]})
+
+        elif path == '/sync/push':
+            # Items replicated from a peer are validated like any other input;
+            # rejected ones are kept as tombstones so both sides converge
+            data = self.read_json_body()
+            if data is None:
+                return
+            items = data.get('items', [])
+            if not isinstance(items, list) or len(items) > SYNC_BATCH:
+                self.send_json_response(400, {'error': f'Items must be a list of at most {SYNC_BATCH}'})
+                return
+            try:
+                tombstones = parse_sync_hashes(data.get('tombstones', []))
+            except ValueError as e:
+                self.send_json_response(400, {'error': str(e)})
+                return
+            new_items, rejected = collection.merge(items, self.clean_item)
+            collection.reject(tombstones)
+            if new_items and collection is self.collections.default:
+                with stats_lock:
+                    stats['unique_domains'] = collection.count()
+            self.send_json_response(200, {'status': 'ok', 'new_domains': len(new_items), 'rejected': rejected})
+            if new_items:
+                logger.info('+%d domains replicated from peer', len(new_items), extra={
+                    'event': 'sync', 'collection': collection.name, 'new_domains': len(new_items),
+                })
+
+        elif path == '/sync':
+            # Run a sync round against a configured peer (or a local stand-in)
+            data = self.read_json_body()
+            if data is None:
+                return
+            spec = data.get('peer', '')
+            mode = data.get('mode', 'both')
+            if not isinstance(spec, str) or not (spec in self.peers or spec.startswith('local:')):
+                self.send_json_response(400, {'error': 'Unknown peer (use a --peer URL or local:<collection>)'})
+                return
+            if mode not in ('pull', 'push', 'both'):
+                self.send_json_response(400, {'error': 'Mode must be pull, push or both'})
+                return
+            try:
+                peer = make_peer(spec, collection, self.collections, self.peer_insecure)
+                result = sync_collection(collection, peer, mode)
+            except Exception as e:
+                logger.warning('Sync of %s with %s failed: %s', collection.name, spec, e,
+                               extra={'event': 'sync', 'collection': collection.name})
+                self.send_json_response(502, {'error': f'Sync failed: {e}'})
+                return
+            if collection is self.collections.default:
+                with stats_lock:
+                    stats['unique_domains'] = collection.count()
+            self.send_json_response(200, dict(result, status='ok'))
 
         else:
             self.send_json_response(404, {'error': 'Not found'})
 
-    def clean_item(self, item):
+    @classmethod
+    def clean_item(cls, item):
         """Clean and validate a domain or URL"""
         if not item or not isinstance(item, str):
             return None
@@ -355,12 +1944,13 @@ class DomainHandler(BaseHTTPRequestHandler):
 
         if is_url:
             # It's a URL - clean it but preserve path
-            return self.clean_url(item)
+            return cls.clean_url(item)
         else:
             # It's a domain - use domain cleaning
-            return self.clean_domain(item)
+            return cls.clean_domain(item)
 
-    def clean_url(self, url):
+    @classmethod
+    def clean_url(cls, url):
         """Clean and validate a full URL"""
         try:
             url = url.strip()
@@ -387,7 +1977,7 @@ class DomainHandler(BaseHTTPRequestHandler):
                 return None
 
             # Check blocked domains
-            if self.is_blocked_domain(domain):
+            if cls.is_blocked_domain(domain):
                 return None
 
             # Reconstruct clean URL (protocol + domain + path, no query/fragment)
@@ -400,7 +1990,8 @@ class DomainHandler(BaseHTTPRequestHandler):
         except Exception:
             return None
 
-    def clean_domain(self, domain):
+    @classmethod
+    def clean_domain(cls, domain):
         """Clean and validate a domain"""
         if not domain or not isinstance(domain, str):
             return None
@@ -436,15 +2027,18 @@ class DomainHandler(BaseHTTPRequestHandler):
             return None
 
         # Check against blocked domains (social media, big tech)
-        if self.is_blocked_domain(domain):
+        if cls.is_blocked_domain(domain):
             return None
 
         return domain
 
-    def is_blocked_domain(self, domain):
-        """Check if domain is in the blocked list"""
-        for blocked in BLOCKED_DOMAINS:
-            if domain == blocked or domain.endswith('.' + blocked):
+    @classmethod
+    def is_blocked_domain(cls, domain):
+        """Check if domain (or any parent domain) is in the blocked list"""
+        blocked = blocked_domains
+        labels = domain.split('.')
+        for i in range(len(labels)):
+            if '.'.join(labels[i:]) in blocked:
                 return True
         return False
 
@@ -478,18 +2072,259 @@ def generate_self_signed_cert(cert_path, key_path):
         return False
 
 
+def load_blocklist(path):
+    """Return BLOCKED_DOMAINS plus the entries of a blocklist file (one per line, # comments)"""
+    domains = set(BLOCKED_DOMAINS)
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                entry = line.split('#', 1)[0].strip().lower().lstrip('*.')
+                if entry:
+                    domains.add(entry)
+    return frozenset(domains)
+
+
+# Options that may be set in --config and are re-applied on SIGHUP, with the
+# JSON type each one takes (matching its argparse definition) and, for
+# integers, the smallest accepted value
+RELOADABLE_SETTINGS = {
+    'verbose': (bool, None),
+    'log_sample': (int, 1),
+    'compress_min_size': (int, 0),
+    'max_loaded': (int, 1),
+    'collection_idle': (int, 0),
+    'peer': (list, None),
+    'blocklist': (str, None),
+}
+
+
+def check_setting(name, value):
+    """Raise ValueError unless value fits the type of the named option"""
+    kind, minimum = RELOADABLE_SETTINGS[name]
+    if name == 'blocklist' and value is None:
+        return
+    if kind is int:
+        if not isinstance(value, int) or isinstance(value, bool):
+            raise ValueError(f'{name} must be an integer')
+        if value < minimum:
+            raise ValueError(f'{name} must be at least {minimum}')
+    elif kind is list:
+        if not isinstance(value, list) or not all(isinstance(v, str) and v for v in value):
+            raise ValueError(f'{name} must be a list of URLs')
+    elif not isinstance(value, kind):
+        raise ValueError(f'{name} must be a {kind.__name__}')
+
+
+def load_config(path):
+    """Read a JSON object of option overrides, keyed by long option name.
+
+    Every setting is type-checked before any is returned, so a bad file is
+    rejected as a whole instead of being half applied.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    if not isinstance(config, dict):
+        raise ValueError(f'{path}: expected a JSON object')
+
+    settings = {}
+    for key, value in config.items():
+        name = key.replace('-', '_')
+        if name not in RELOADABLE_SETTINGS:
+            raise ValueError(f'{path}: unsupported setting {key!r}')
+        try:
+            check_setting(name, value)
+        except ValueError as e:
+            raise ValueError(f'{path}: {e}')
+        settings[name] = value
+    return settings
+
+
+def apply_settings(args, blocklist):
+    """Push reloadable settings into the running server"""
+    global blocked_domains
+
+    blocked_domains = blocklist
+    configure_logging(args.verbose, args.log_sample)
+    DomainHandler.compress_min_size = args.compress_min_size
+    DomainHandler.peers[:] = args.peer  # in place: the sync thread holds this list
+
+    collections = DomainHandler.collections
+    if collections:
+        collections.max_loaded = max(1, args.max_loaded)
+        collections.idle_timeout = args.collection_idle
+
+
+def reload_config(args, cli_args):
+    """SIGHUP: re-read the config file and blocklist without restarting.
+
+    Settings are rebuilt from the command line (``cli_args``, never
+    modified) plus the current file, so a setting removed from the file
+    falls back to its command-line value.
+    """
+    settings = {name: getattr(cli_args, name) for name in RELOADABLE_SETTINGS}
+    try:
+        if args.config:
+            settings.update(load_config(args.config))
+        blocklist = load_blocklist(settings['blocklist'])
+    except (OSError, ValueError) as e:
+        logger.error('Reload failed, keeping previous settings: %s', e)
+        return
+
+    vars(args).update(settings)
+    apply_settings(args, blocklist)
+    logger.warning('Configuration reloaded (%d blocked domains)', len(blocklist),
+                   extra={'event': 'reload'})
+
+
+def create_server(server_address):
+    """Bind a new server, or adopt the listening socket handed over by a previous process"""
+    inherited_fd = os.environ.pop(LISTEN_FD_ENV, None)
+    if not inherited_fd:
+        return ThreadedHTTPServer(server_address, DomainHandler)
+
+    httpd = ThreadedHTTPServer(server_address, DomainHandler, bind_and_activate=False)
+    httpd.socket.close()
+    httpd.socket = socket.socket(fileno=int(inherited_fd))
+    httpd.server_address = httpd.socket.getsockname()
+    host, port = httpd.server_address[:2]
+    httpd.server_name = socket.getfqdn(host)
+    httpd.server_port = port
+    return httpd
+
+
+def hand_off(httpd):
+    """SIGUSR2: start a successor on the listening socket, then stop once it is ready.
+
+    The successor reports on one pipe when it has adopted the socket and
+    loaded its config, then waits for the other pipe to close, which
+    happens once this process has drained and flushed. If it does not
+    come up in time, it is killed and this process keeps serving.
+    """
+    global shutdown_action, handoff_go_fd
+
+    fd = httpd.socket.fileno()
+    ready_r, ready_w = os.pipe()
+    go_r, go_w = os.pipe()
+    env = dict(os.environ)
+    env[LISTEN_FD_ENV] = str(fd)
+    env[HANDOFF_FDS_ENV] = f'{ready_w},{go_r}'
+    cmd = [sys.executable, os.path.abspath(sys.argv[0])] + sys.argv[1:]
+
+    process = None
+    ready = False
+    try:
+        process = subprocess.Popen(cmd, env=env, pass_fds=(fd, ready_w, go_r))
+    except OSError as e:
+        logger.error('Could not start successor: %s', e)
+    finally:
+        os.close(ready_w)
+        os.close(go_r)
+
+    if process:
+        # EOF (the successor exited) reads as b'' and counts as not ready
+        readable, _, _ = select.select([ready_r], [], [], HANDOFF_TIMEOUT)
+        ready = bool(readable) and os.read(ready_r, 1) == b'1'
+    os.close(ready_r)
+
+    if not ready:
+        os.close(go_w)
+        if process and process.poll() is None:
+            process.terminate()
+            process.wait()
+        shutdown_action = None
+        logger.error('Successor did not become ready, still serving', extra={'event': 'handoff'})
+        return
+
+    handoff_go_fd = go_w
+    logger.warning('Listening socket handed off to PID %d', process.pid, extra={'event': 'handoff'})
+    httpd.shutdown()
+
+
+def wait_for_handoff():
+    """In a successor: report readiness, then wait until the old process has drained"""
+    fds = os.environ.pop(HANDOFF_FDS_ENV, None)
+    if not fds:
+        return
+    ready_w, go_r = (int(fd) for fd in fds.split(','))
+    os.write(ready_w, b'1')
+    os.close(ready_w)
+    # The old process closes its end after flushing (or by exiting)
+    while os.read(go_r, 1):
+        pass
+    os.close(go_r)
+
+
+def idle_loop(collections):
+    """Periodically unload idle collections, even when only the default one is in use"""
+    while True:
+        # Re-read each round: collection_idle may change on reload
+        interval = min(MAX_IDLE_SWEEP_INTERVAL, max(1, collections.idle_timeout / 2))
+        if background_stop.wait(interval):
+            return
+        collections.unload_idle()
+
+
+def flush_loop(collections, interval):
+    """Periodically write buffered collection changes to disk"""
+    while not background_stop.wait(interval):
+        collections.flush_all()
+
+
 def signal_handler(sig, frame):
-    """Handle Ctrl+C gracefully"""
+    """Handle Ctrl+C/SIGTERM (drain and stop) and SIGUSR2 (drain and hand off)"""
+    global shutdown_action
+
+    if shutdown_action:
+        print(f"{Colors.YELLOW}[*] Already shutting down, waiting for in-flight requests...{Colors.ENDC}")
+        return
+
+    if httpd_server is None:
+        sys.exit(0)
+
+    # shutdown() waits for serve_forever() to return, so neither it nor the
+    # handoff may run on the main thread, which is the one serving
+    if sig == getattr(signal, 'SIGUSR2', None):
+        shutdown_action = 'handoff'
+        print(f"\n{Colors.YELLOW}[*] Handing off to a new server process...{Colors.ENDC}")
+        threading.Thread(target=hand_off, args=(httpd_server,), daemon=True).start()
+    else:
+        shutdown_action = 'stop'
+        print(f"\n{Colors.YELLOW}[*] Shutting down...{Colors.ENDC}")
+        threading.Thread(target=httpd_server.shutdown, daemon=True).start()
+
+
+def finish_shutdown(drain_timeout):
+    """Drain in-flight requests, persist collections, then exit (releasing a waiting successor)"""
     global pid_file_path
-    print(f"\n{Colors.YELLOW}[*] Shutting down...{Colors.ENDC}")
 
-    # Remove PID file
+    background_stop.set()
+
+    # New connections are no longer accepted; they queue in the listen
+    # backlog until this process exits or a successor picks them up
+    if not httpd_server.wait_idle(drain_timeout):
+        logger.warning('Drain deadline reached with %d request(s) still running',
+                       httpd_server.active_requests)
+
+    DomainHandler.collections.flush_all()
+
+    # Remove PID file if it is still ours. This must happen before a waiting
+    # successor is released, as it writes its own PID as soon as it is
     if pid_file_path and os.path.exists(pid_file_path):
         try:
-            os.remove(pid_file_path)
+            with open(pid_file_path, 'r') as f:
+                if f.read().strip() == str(os.getpid()):
+                    os.remove(pid_file_path)
         except Exception:
             pass
 
+    if handoff_go_fd is not None:
+        os.close(handoff_go_fd)
+
+    httpd_server.server_close()
+
+    # Flush pending log records before printing the summary
+    stop_logging()
+
     # Print final stats
     if stats['start_time']:
         uptime = str(datetime.now() - stats['start_time']).split('.')[0]
@@ -503,7 +2338,7 @@ def signal_handler(sig, frame):
 
 
 def main():
-    global stats, pid_file_path
+    global stats, pid_file_path, httpd_server, blocked_domains
 
     parser = argparse.ArgumentParser(
         description='CrawlGoogle Server - Receive domains from Chrome extension',
@@ -545,15 +2380,108 @@ def main():
         default='server.key',
         help='Path to SSL private key (default: server.key)'
     )
+    parser.add_argument(
+        '--collections-dir',
+        type=str,
+        default=None,
+        help='Directory for named collections (default: "collections" next to the output file)'
+    )
+    parser.add_argument(
+        '--max-loaded',
+        type=int,
+        default=DEFAULT_MAX_LOADED,
+        help=f'Named collections kept in memory at once (default: {DEFAULT_MAX_LOADED})'
+    )
+    parser.add_argument(
+        '--collection-idle',
+        type=int,
+        default=DEFAULT_COLLECTION_IDLE,
+        metavar='SECONDS',
+        help=f'Unload collections idle for this long (default: {DEFAULT_COLLECTION_IDLE})'
+    )
+    parser.add_argument(
+        '--peer',
+        action='append',
+        default=[],
+        metavar='URL',
+        help='Peer server to replicate with (repeatable), e.g. http://10.0.0.2:9876'
+    )
+    parser.add_argument(
+        '--sync-interval',
+        type=int,
+        default=0,
+        metavar='SECONDS',
+        help='Sync all collections with every --peer this often (default: 0, manual only)'
+    )
+    parser.add_argument(
+        '--peer-insecure',
+        action='store_true',
+        help='Do not verify peer HTTPS certificates (self-signed peers)'
+    )
+    parser.add_argument(
+        '--compress-min-size',
+        type=int,
+        default=DEFAULT_COMPRESS_MIN_SIZE,
+        help=f'Minimum response size in bytes before gzip/brotli is applied (default: {DEFAULT_COMPRESS_MIN_SIZE})'
+    )
     parser.add_argument(
         '-v', '--verbose',
         action='store_true',
-        help='Enable verbose logging'
+        help='Enable verbose logging (debug level, lists each new domain)'
+    )
+    parser.add_argument(
+        '--log-format',
+        choices=['text', 'json'],
+        default='text',
+        help='Log output format: colored text or JSON lines (default: text)'
+    )
+    parser.add_argument(
+        '--log-sample',
+        type=int,
+        default=1,
+        metavar='N',
+        help='Only log 1 in N health checks and duplicate-only batches (default: 1, log all)'
+    )
+    parser.add_argument(
+        '--config',
+        type=str,
+        default=None,
+        help=f'JSON file overriding {", ".join(RELOADABLE_SETTINGS)} (re-read on SIGHUP)'
+    )
+    parser.add_argument(
+        '--blocklist',
+        type=str,
+        default=None,
+        help='File of extra domains to block, one per line (re-read on SIGHUP)'
+    )
+    parser.add_argument(
+        '--flush-interval',
+        type=int,
+        default=0,
+        metavar='SECONDS',
+        help='Buffer collection writes and flush them this often (default: 0, write immediately)'
+    )
+    parser.add_argument(
+        '--drain-timeout',
+        type=int,
+        default=DEFAULT_DRAIN_TIMEOUT,
+        metavar='SECONDS',
+        help=f'Time allowed for in-flight requests on shutdown (default: {DEFAULT_DRAIN_TIMEOUT})'
     )
     parser.add_argument(
         '--stop',
         action='store_true',
-        help='Stop a running server'
+        help='Stop a running server (drains in-flight requests first)'
+    )
+    parser.add_argument(
+        '--reload',
+        action='store_true',
+        help='Make a running server re-read its config and blocklist (SIGHUP)'
+    )
+    parser.add_argument(
+        '--restart',
+        action='store_true',
+        help='Restart a running server without dropping connections (SIGUSR2)'
     )
     parser.add_argument(
         '--pid-file',
@@ -614,33 +2542,60 @@ def main():
 
         sys.exit(0)
 
-    # Set up signal handler
+    # Handle --reload / --restart arguments
+    if args.reload or args.restart:
+        sig = signal.SIGHUP if args.reload else signal.SIGUSR2
+        try:
+            with open(args.pid_file, 'r') as f:
+                pid = int(f.read().strip())
+            os.kill(pid, sig)
+        except (OSError, ValueError) as e:
+            print(f"{Colors.RED}[!] Could not signal server via {args.pid_file}: {e}{Colors.ENDC}")
+            sys.exit(1)
+        action = 'reload' if args.reload else 'restart'
+        print(f"{Colors.GREEN}[+] Sent {action} to server (PID {pid}){Colors.ENDC}")
+        sys.exit(0)
+
+    # Reloads start again from the command line, not from the live settings
+    cli_args = argparse.Namespace(**vars(args))
+
+    try:
+        if args.config:
+            vars(args).update(load_config(args.config))
+        blocked_domains = load_blocklist(args.blocklist)
+    except (OSError, ValueError) as e:
+        print(f"{Colors.RED}[!] {e}{Colors.ENDC}")
+        sys.exit(1)
+
+    setup_logging(args.log_format, args.verbose, args.log_sample)
+
+    # Set up signal handlers
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
-
-    DomainHandler.output_file = args.output
+    if hasattr(signal, 'SIGUSR2'):
+        signal.signal(signal.SIGUSR2, signal_handler)
+    if hasattr(signal, 'SIGHUP'):
+        # Reload off the main thread, which is busy serving
+        signal.signal(signal.SIGHUP, lambda sig, frame: threading.Thread(
+            target=reload_config, args=(args, cli_args), daemon=True).start())
 
     # Ensure output directory exists
     output_dir = os.path.dirname(args.output)
     if output_dir:
         os.makedirs(output_dir, exist_ok=True)
 
-    # Count existing domains
-    existing_count = 0
-    if os.path.exists(args.output):
-        with open(args.output, 'r', encoding='utf-8') as f:
-            existing_count = sum(1 for line in f if line.strip())
+    if args.collections_dir is None:
+        args.collections_dir = os.path.join(output_dir, 'collections')
 
-    stats['unique_domains'] = existing_count
-    stats['start_time'] = datetime.now()
-
-    # Save PID file
-    pid_file_path = args.pid_file
-    with open(pid_file_path, 'w') as f:
-        f.write(str(os.getpid()))
+    DomainHandler.collections = CollectionManager(
+        args.output, args.collections_dir, args.max_loaded, args.collection_idle,
+        buffered=args.flush_interval > 0
+    )
+    DomainHandler.peer_insecure = args.peer_insecure
+    apply_settings(args, blocked_domains)
 
     server_address = (args.bind, args.port)
-    httpd = ThreadedHTTPServer(server_address, DomainHandler)
+    httpd = create_server(server_address)
 
     protocol = 'HTTP'
 
@@ -661,6 +2616,20 @@ def main():
             context.load_cert_chain(args.cert, args.key)
             httpd.socket = context.wrap_socket(httpd.socket, server_side=True)
 
+    # When taking over from an old process, load nothing until it has flushed
+    wait_for_handoff()
+
+    # Count existing domains (also loads the default collection)
+    existing_count = DomainHandler.collections.default.count()
+
+    stats['unique_domains'] = existing_count
+    stats['start_time'] = datetime.now()
+
+    # Save PID file
+    pid_file_path = args.pid_file
+    with open(pid_file_path, 'w') as f:
+        f.write(str(os.getpid()))
+
     output_abs = os.path.abspath(args.output)
 
     print(f"""
@@ -676,9 +2645,12 @@ def main():
 {Colors.YELLOW}║    GET  /ping    - Health check                           ║
 ║    GET  /domains - List all domains                       ║
 ║    GET  /stats   - Get statistics                         ║
+║    GET  /query   - Filter by host/path (see README)       ║
 ║    GET  /export  - Download domains.txt                   ║
 ║    POST /domains - Add new domains                        ║
-║    POST /clear   - Clear all domains                      ║{Colors.ENDC}
+║    POST /clear   - Clear all domains                      ║
+║    GET  /collections    - List named collections          ║
+║    *    /c/<name>/...   - Same endpoints, per collection  ║{Colors.ENDC}
 {Colors.RED}╚═══════════════════════════════════════════════════════════╝{Colors.ENDC}
     """)
 
@@ -688,12 +2660,34 @@ def main():
     else:
         print(f"{Colors.CYAN}[*] HTTP URL: http://{args.bind}:{args.port}{Colors.ENDC}")
 
+    # Started even without --peer: peers may be added later by a reload
+    if args.sync_interval > 0:
+        threading.Thread(
+            target=sync_loop,
+            args=(DomainHandler.collections, DomainHandler.peers, args.sync_interval, args.peer_insecure,
+                  background_stop),
+            daemon=True
+        ).start()
+        print(f"{Colors.CYAN}[*] Syncing with {len(args.peer)} peer(s) every {args.sync_interval}s{Colors.ENDC}")
+
     print(f"\n{Colors.GREEN}[*] Waiting for domains... (Ctrl+C to stop){Colors.ENDC}\n")
 
+    threading.Thread(target=idle_loop, args=(DomainHandler.collections,), daemon=True).start()
+
+    if args.flush_interval > 0:
+        threading.Thread(
+            target=flush_loop,
+            args=(DomainHandler.collections, args.flush_interval),
+            daemon=True
+        ).start()
+
+    httpd_server = httpd
     try:
         httpd.serve_forever()
     except KeyboardInterrupt:
-        signal_handler(None, None)
+        pass
+
+    finish_shutdown(args.drain_timeout)
 
 
 if __name__ == '__main__':